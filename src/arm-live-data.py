@@ -1,19 +1,49 @@
-import requests
+import base64
+import httpx
 import json
+import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Dict, Optional
+from typing import AsyncIterator, BinaryIO, Dict, Optional
 from mcp.server.fastmcp import FastMCP
 import os
+import re
 import sys
 import traceback
 from datetime import datetime, timedelta
+from functools import lru_cache
 from dotenv import load_dotenv
 import asyncio
 import netCDF4 as nc
+import numpy as np
+import orjson
 import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+
+# Use hidefix (if installed) to read netCDF-4 variables with its parallel,
+# index-based chunk reader
+try:
+    import hidefix
+    HAVE_HIDEFIX = True
+except ImportError:
+    HAVE_HIDEFIX = False
+
 # Load environment variables from .env file
 load_dotenv()
 
+# Set ARM_DEBUG=1 to log request URLs, parameters and response headers
+DEBUG = os.getenv("ARM_DEBUG") == "1"
+
+# httpx logs every request URL at INFO, and the URL carries the API token in
+# the user parameter. FastMCP configures INFO logging, so keep httpx quiet
+# (even with ARM_DEBUG, which logs redacted params instead)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+class CDFOpenError(Exception):
+    """Raised when a file can't be opened as netCDF (e.g. a corrupt download)"""
+
 def log_error(message: str):
     """Helper function to log errors to stderr with timestamp"""
     print(f"[ERROR] {message}", file=sys.stderr)
@@ -28,10 +58,28 @@ def log_info(message: str):
 # log_info(f"Current working directory: {os.getcwd()}")
 # log_info(f"Absolute path: {Path.cwd().absolute()}")
 
+@asynccontextmanager
+async def server_lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """Close the shared HTTP client once the last MCP session ends.
+    
+    FastMCP enters the lifespan once per session (per connection with the SSE
+    transport), so sessions are counted and only the last one closes the client.
+    """
+    global _ACTIVE_SESSIONS, _HTTPX
+    _ACTIVE_SESSIONS += 1
+    try:
+        yield
+    finally:
+        _ACTIVE_SESSIONS -= 1
+        if _ACTIVE_SESSIONS == 0 and _HTTPX is not None:
+            client, _HTTPX = _HTTPX, None
+            await client.aclose()
+            log_info("HTTP client closed")
+
 # Initialize FastMCP server
 try:
     print("Initializing MCP server...", file=sys.stderr)
-    mcp = FastMCP("arm_livedata")
+    mcp = FastMCP("arm_livedata", lifespan=server_lifespan)
     log_info("MCP server initialized successfully")
 except Exception as e:
     log_error(f"Failed to initialize MCP server: {str(e)}")
@@ -44,8 +92,73 @@ except Exception as e:
 ARM_API_BASE = "https://adc.arm.gov/armlive/data"
 USER_AGENT = "arm-live-data/1.0"
 
+# API endpoints, relative to ARM_API_BASE
+QUERY_PATH = "/query"
+SAVE_DATA_PATH = "/saveData"
+
+# Request parameter templates, copied and filled in per request. Per the API
+# docs user must be the first parameter, and wt=json is required for a JSON
+# response from query
+QUERY_PARAMS_TEMPLATE = {"user": None, "ds": None, "start": None, "end": None, "wt": "json"}
+SAVE_DATA_PARAMS_TEMPLATE = {"user": None, "file": None}
+
+# Leading YYYY-MM-DD of a date or ISO timestamp string
+DATE_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})")
+
+# On-disk cache for downloaded CDF files. ARM file names include the date and
+# time, so a cached file never goes stale
+CACHE_DIR = Path(os.getenv("ARM_CACHE_DIR", "~/.cache/arm-live-data")).expanduser()
+# Cached files live in their own subdirectory, so eviction never touches
+# anything else that happens to be in ARM_CACHE_DIR
+CACHE_FILES_DIR = CACHE_DIR / "cdf-files"
+CACHE_MAX_BYTES = int(os.getenv("ARM_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+# Reference counts of cached files currently being read, which eviction skips
+_CACHE_IN_USE: Counter[Path] = Counter()
+
+# In-memory cache of query_live_data results keyed by (datastream, start, end)
+QUERY_CACHE_TTL = 300
+QUERY_CACHE_MAXSIZE = 256
+_QUERY_CACHE: OrderedDict[tuple, tuple[float, Dict]] = OrderedDict()
+# Per-key locks so concurrent identical queries wait for one request
+_QUERY_LOCKS: dict[tuple, asyncio.Lock] = {}
+
+# Maximum number of saveData downloads in flight for batch requests
+MAX_CONCURRENT_DOWNLOADS = 8
+
+# Serializes netCDF4 access from worker threads
+NETCDF_LOCK = threading.Lock()
+
+# HDF5 chunk cache used when reading a variable from a netCDF-4 file
+CHUNK_CACHE_SIZE = 64 * 1024 * 1024
+CHUNK_CACHE_NELEMS = 1009
+CHUNK_CACHE_PREEMPTION = 0.75
+
+# Shared async HTTP client so tool calls don't block the event loop and reuse
+# keep-alive connections to adc.arm.gov. Created on first use by
+# get_http_client and closed by server_lifespan when no session is left
+_HTTPX: Optional[httpx.AsyncClient] = None
+_ACTIVE_SESSIONS = 0
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared ARM API client, creating it if it doesn't exist or was closed."""
+    global _HTTPX
+    if _HTTPX is None or _HTTPX.is_closed:
+        _HTTPX = httpx.AsyncClient(
+            base_url=ARM_API_BASE,
+            timeout=httpx.Timeout(60.0, connect=5.0),
+            headers={"User-Agent": USER_AGENT},
+            # Pool limits must be set on the transport; httpx ignores the client's
+            # limits when a transport is passed in
+            transport=httpx.AsyncHTTPTransport(
+                retries=3,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            ),
+        )
+    return _HTTPX
+
+@lru_cache(maxsize=1)
 def get_credentials() -> tuple[str, str]:
-    """Get ARM credentials from environment variables.
+    """Get ARM credentials from environment variables (read once per process).
     
     Returns:
         Tuple of (username, api_token)
@@ -64,6 +177,127 @@ def get_credentials() -> tuple[str, str]:
     
     return username, api_token
 
+@lru_cache(maxsize=1)
+def get_user_param() -> str:
+    """Get the 'user' query parameter (username:api_token) expected by the ARM API."""
+    username, api_token = get_credentials()
+    return f"{username}:{api_token}"
+
+def redact_params(params: Dict) -> Dict:
+    """Return a copy of request params that is safe to log (the 'user' value holds the API token)."""
+    return {**params, "user": "REDACTED"}
+
+def normalize_date(value, default: datetime) -> str:
+    """Reduce a date, datetime or ISO timestamp string to the YYYY-MM-DD form the API expects.
+    
+    Args:
+        value: datetime object or string such as YYYY-MM-DD or YYYY-MM-DDThh:mm:ssZ
+        default: datetime to use when value is empty
+        
+    Returns:
+        Date string in YYYY-MM-DD format (other strings are returned unchanged)
+    """
+    if not value:
+        return default.strftime("%Y-%m-%d")
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    match = DATE_RE.match(value)
+    return match.group(1) if match else value
+
+def encode_array(data) -> Dict:
+    """Encode a NumPy array as base64 raw bytes plus the dtype and shape needed to rebuild it.
+    
+    Args:
+        data: The array to encode (plain or masked)
+        
+    Returns:
+        Dict with 'dtype', 'shape' and 'data_b64' keys, plus 'mask_b64' if any values are masked
+    """
+    raw = np.asarray(np.ma.getdata(data))
+    arr = np.ascontiguousarray(raw)
+    result = {"dtype": arr.dtype.str, "shape": list(raw.shape)}
+
+    # Object arrays (e.g. variable-length strings) have no raw byte representation
+    if arr.dtype.hasobject:
+        result["data"] = arr.tolist()
+        return result
+
+    # Encode straight from the array's buffer rather than copying it out with tobytes()
+    result["data_b64"] = base64.b64encode(memoryview(arr)).decode("ascii")
+    if np.ma.is_masked(data):
+        mask = np.ascontiguousarray(np.ma.getmaskarray(data))
+        result["mask_b64"] = base64.b64encode(memoryview(mask)).decode("ascii")
+    return result
+
+def get_cached_query(key: tuple) -> Optional[Dict]:
+    """Return a cached query_live_data result, or None if missing or older than QUERY_CACHE_TTL."""
+    entry = _QUERY_CACHE.get(key)
+    if entry is None:
+        return None
+    stored_at, data = entry
+    if time.monotonic() - stored_at > QUERY_CACHE_TTL:
+        del _QUERY_CACHE[key]
+        return None
+    _QUERY_CACHE.move_to_end(key)
+    return data
+
+def cache_query(key: tuple, data: Dict) -> None:
+    """Store a query_live_data result, evicting the least recently used entry when full."""
+    _QUERY_CACHE[key] = (time.monotonic(), data)
+    _QUERY_CACHE.move_to_end(key)
+    while len(_QUERY_CACHE) > QUERY_CACHE_MAXSIZE:
+        _QUERY_CACHE.popitem(last=False)
+
+async def fetch_live_data(datastream: str, start_time: str, end_time: str) -> Dict:
+    """Send a query to the ARM Live Data API.
+    
+    Args:
+        datastream: The datastream to query
+        start_time: Start date in YYYY-MM-DD format
+        end_time: End date in YYYY-MM-DD format
+        
+    Returns:
+        Dict containing the live data
+    """
+    # Fill in the template so the parameters keep the order the API expects
+    params = QUERY_PARAMS_TEMPLATE.copy()
+    params["user"] = get_user_param()
+    params["ds"] = datastream
+    params["start"] = start_time
+    params["end"] = end_time
+    
+    if DEBUG:
+        log_info(f"Request URL: {ARM_API_BASE}{QUERY_PATH}")
+        log_info(f"Request params: {redact_params(params)}")
+
+    # Make API request with params
+    response = await get_http_client().get(QUERY_PATH, params=params)
+
+    log_info(f"Response status code: {response.status_code}")
+    if DEBUG:
+        log_info(f"Response headers: {dict(response.headers)}")
+
+    if response.status_code == 200:
+        try:
+            # orjson.JSONDecodeError subclasses json.JSONDecodeError, so the
+            # handler below still catches parse failures
+            data = orjson.loads(response.content)
+            log_info(f"Successfully retrieved data. Response size: {len(response.content)} bytes")
+            return data
+        except json.JSONDecodeError as e:
+            log_error(f"Failed to parse JSON response: {str(e)}")
+            log_error(f"Raw response: {response.text[:500]}...")  # Show first 500 chars of response
+            raise
+    elif response.status_code == 401:
+        error_msg = "Authentication failed. Please check your ARM credentials."
+        log_error(error_msg)
+        log_error(f"Response text: {response.text}")
+        raise Exception(error_msg)
+    else:
+        error_msg = f"Error fetching live data: {response.status_code}, {response.text}"
+        log_error(error_msg)
+        raise Exception(error_msg)
+
 @mcp.tool()
 async def query_live_data(
     datastream: str,
@@ -86,72 +320,31 @@ async def query_live_data(
         log_info(f"Using credentials for user: {username}")
         
         # Set default time range if not provided
-        if not start_time:
-            start_time = (datetime.utcnow() - timedelta(hours=1)).strftime("%Y-%m-%d")
-        else:
-            # If start_time is a datetime object, convert it to string
-            if isinstance(start_time, datetime):
-                start_time = start_time.strftime("%Y-%m-%d")
-            # If it's a string in YYYY-MM-DDThh:mm:ss format, extract just the date
-            elif isinstance(start_time, str) and "T" in start_time:
-                start_time = start_time.split("T")[0]
-            # If it's already a string in YYYY-MM-DD format, use it as is
-            elif isinstance(start_time, str) and len(start_time) == 10:
-                start_time = start_time
-
-        if not end_time:
-            end_time = datetime.utcnow().strftime("%Y-%m-%d")
-        else:
-            # If end_time is a datetime object, convert it to string
-            if isinstance(end_time, datetime):
-                end_time = end_time.strftime("%Y-%m-%d")
-            # If it's a string in YYYY-MM-DDThh:mm:ss format, extract just the date
-            elif isinstance(end_time, str) and "T" in end_time:
-                end_time = end_time.split("T")[0]
-            # If it's already a string in YYYY-MM-DD format, use it as is
-            elif isinstance(end_time, str) and len(end_time) == 10:
-                end_time = end_time
-
-        # Construct URL with correct format according to API docs
-        # user must be first parameter, and we need wt=json for JSON response
-        base_url = f"{ARM_API_BASE}/query"
-        params = {
-            "user": f"{username}:{api_token}",  # user must be first parameter
-            "ds": datastream,
-            "start": start_time,
-            "end": end_time,
-            "wt": "json"  # required for JSON response
-        }
-        
-        log_info(f"Request URL: {base_url}")
-        log_info(f"Request params: {params}")
+        now = datetime.utcnow()
+        start_time = normalize_date(start_time, now - timedelta(hours=1))
+        end_time = normalize_date(end_time, now)
 
-        # Make API request with params
-        response = requests.get(base_url, params=params)
+        # Serve repeated queries from the cache, and let concurrent identical
+        # queries share a single request
+        key = (datastream, start_time, end_time)
+        data = get_cached_query(key)
+        if data is not None:
+            log_info(f"Using cached query result for {datastream} ({start_time} to {end_time})")
+            return data
 
-        log_info(f"Response status code: {response.status_code}")
-        log_info(f"Response headers: {dict(response.headers)}")
-
-        if response.status_code == 200:
-            try:
-                data = response.json()
-                log_info(f"Successfully retrieved data. Response size: {len(str(data))} bytes")
+        lock = _QUERY_LOCKS.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                data = get_cached_query(key)
+                if data is None:
+                    data = await fetch_live_data(datastream, start_time, end_time)
+                    cache_query(key, data)
                 return data
-            except json.JSONDecodeError as e:
-                log_error(f"Failed to parse JSON response: {str(e)}")
-                log_error(f"Raw response: {response.text[:500]}...")  # Show first 500 chars of response
-                raise
-        elif response.status_code == 401:
-            error_msg = "Authentication failed. Please check your ARM credentials."
-            log_error(error_msg)
-            log_error(f"Response text: {response.text}")
-            raise Exception(error_msg)
-        else:
-            error_msg = f"Error fetching live data: {response.status_code}, {response.text}"
-            log_error(error_msg)
-            raise Exception(error_msg)
+        finally:
+            if _QUERY_LOCKS.get(key) is lock:
+                del _QUERY_LOCKS[key]
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         log_error(f"Network error occurred: {str(e)}")
         raise Exception(f"Network error while querying ARM Live Data API: {str(e)}")
     except Exception as e:
@@ -161,36 +354,131 @@ async def query_live_data(
         raise Exception(f"Error querying ARM Live Data API: {str(e)}")
 
 
-async def read_cdf_file(cdf_file: str) -> Dict:
-    """Read data from a CDF file.
+async def read_cdf_file(cdf_file: str, variables: Optional[list[str]] = None, auto_mask: bool = False) -> Dict:
+    """Read data from a CDF file in a worker thread so the event loop stays free.
     
     Args:
         cdf_file: The name of the CDF file to read (e.g. 'nsametC1.b1.20200101.000000.cdf')
+        variables: Only read these variables (optional, defaults to reading every variable)
+        auto_mask: Return masked arrays with fill values masked out (optional, defaults to raw arrays)
         
     Returns:
         Dict containing the CDF data with variables and their attributes
     """
-    try:
-        # Open the CDF file
-        dataset = nc.Dataset(cdf_file, 'r')
-        
-        # Initialize result dictionary
-        result = {'variables': {}}
+    return await asyncio.to_thread(read_cdf_file_sync, cdf_file, variables, auto_mask)
+
+# Attributes that make netCDF4 convert values on read (with auto-scale on),
+# which hidefix would return unconverted
+HIDEFIX_UNSAFE_ATTRS = ("scale_factor", "add_offset", "_Unsigned", "_Encoding")
+
+def hidefix_can_read(var, attrs: Dict) -> bool:
+    """Check whether hidefix returns exactly what netCDF4 returns for a variable.
+    
+    Only non-scalar, native-endian numeric variables without any value-converting
+    attributes qualify. Compound, enum and variable-length types, char/string data
+    and big-endian variables are either converted by netCDF4 or unsupported by hidefix.
+    """
+    if not isinstance(var.datatype, np.dtype):
+        return False
+    if var.dtype.kind not in "iuf" or not var.dtype.isnative or var.ndim == 0:
+        return False
+    return not any(attr in attrs for attr in HIDEFIX_UNSAFE_ATTRS)
+
+def read_hidefix_variable(index, var, attrs: Dict):
+    """Read a whole variable through a hidefix index.
+    
+    Args:
+        index: hidefix.Index of the file
+        var: The netCDF4 variable to read
+        attrs: The variable's attributes
         
-        # Process each variable in the dataset
-        for var_name, var in dataset.variables.items():
-            # Get variable data and attributes
-            var_data = var[:]
-            var_attrs = {attr: var.getncattr(attr) for attr in var.ncattrs()}
+    Returns:
+        NumPy array of the raw values, or None if hidefix cannot provide the
+        same values as netCDF4 for this variable
+    """
+    if not hidefix_can_read(var, attrs):
+        return None
+    try:
+        data = index.dataset(var.name)[()]
+    except (KeyboardInterrupt, SystemExit):
+        raise
+    except BaseException as e:
+        # hidefix reports unsupported layouts with a Rust panic, which derives
+        # from BaseException rather than Exception
+        log_info(f"hidefix could not read {var.name}, using netCDF4: {str(e)}")
+        return None
+
+    # Fall back if hidefix disagrees with netCDF4 about what the variable is
+    if not isinstance(data, np.ndarray) or data.dtype != var.dtype or data.shape != var.shape:
+        log_info(f"hidefix result for {var.name} does not match netCDF4, using netCDF4")
+        return None
+    return data
+
+def read_cdf_file_sync(cdf_file: str, variables: Optional[list[str]] = None, auto_mask: bool = False) -> Dict:
+    """Read data from a CDF file (blocking, see read_cdf_file for the arguments).
+    
+    Returns:
+        Dict containing the CDF data with variables and their attributes
+    """
+    try:
+        # The netCDF-C library is not thread-safe, so worker threads take turns
+        with NETCDF_LOCK:
+            # Open the CDF file
+            try:
+                dataset = nc.Dataset(cdf_file, 'r')
+            except OSError as e:
+                raise CDFOpenError(str(e)) from e
+            # Skip building a parallel mask array unless the caller asked for one
+            dataset.set_auto_mask(auto_mask)
+            # Chunk caches only exist for HDF5-backed (netCDF-4) files
+            is_hdf5 = dataset.data_model.startswith("NETCDF4")
             
-            # Store variable data and attributes
-            result['variables'][var_name] = {
-                'data': var_data,
-                **var_attrs
-            }
-        
-        # Close the dataset
-        dataset.close()
+            # Initialize result dictionary
+            result = {'variables': {}}
+            
+            # Only materialize the requested variables instead of every array in the file
+            if variables is not None:
+                missing = [name for name in variables if name not in dataset.variables]
+                if missing:
+                    dataset.close()
+                    raise ValueError(f"Variables {missing} not found in {cdf_file}")
+                selected = {name: dataset.variables[name] for name in variables}
+            else:
+                selected = dataset.variables
+
+            # hidefix only understands HDF5 files and never masks values
+            hidefix_index = None
+            if HAVE_HIDEFIX and is_hdf5 and not auto_mask:
+                try:
+                    hidefix_index = hidefix.Index(cdf_file)
+                except Exception as e:
+                    log_info(f"hidefix could not index {cdf_file}, using netCDF4: {str(e)}")
+
+            # Process each selected variable in the dataset
+            for var_name, var in selected.items():
+                # Get variable data and attributes
+                # netCDF4 builds the full attribute dict in one call
+                var_attrs = var.__dict__
+                var_data = None
+                if hidefix_index is not None:
+                    var_data = read_hidefix_variable(hidefix_index, var, var_attrs)
+                if var_data is None:
+                    if is_hdf5:
+                        var.set_var_chunk_cache(
+                            size=CHUNK_CACHE_SIZE,
+                            nelems=CHUNK_CACHE_NELEMS,
+                            preemption=CHUNK_CACHE_PREEMPTION,
+                        )
+                    var_data = var[:]
+                
+                # Store variable data and attributes
+                result['variables'][var_name] = {
+                    'data': var_data,
+                    **var_attrs
+                }
+            
+            # Close the dataset
+            dataset.close()
         
         log_info(f"Successfully read CDF file: {cdf_file}")
         return result
@@ -199,61 +487,178 @@ async def read_cdf_file(cdf_file: str) -> Dict:
         log_error(f"Error reading CDF file {cdf_file}: {str(e)}")
         log_error("Full traceback:")
         traceback.print_exc(file=sys.stderr)
-        raise Exception(f"Error reading CDF file: {str(e)}")
+        # Keep the open failure distinguishable so cached copies can be discarded
+        error_type = CDFOpenError if isinstance(e, CDFOpenError) else Exception
+        raise error_type(f"Error reading CDF file: {str(e)}")
+
+async def download_cdf_file(cdf_file: str, dest: BinaryIO) -> None:
+    """Download a CDF file from the ARM Live Data API saveData endpoint.
+    
+    Args:
+        cdf_file: The name of the CDF file to download (e.g. 'nsametC1.b1.20200101.000000.cdf')
+        dest: Open binary file to write the file contents to
+    """
+    params = SAVE_DATA_PARAMS_TEMPLATE.copy()
+    params["user"] = get_user_param()
+    params["file"] = cdf_file
+    
+    log_info(f"Downloading CDF file: {cdf_file}")
+    if DEBUG:
+        log_info(f"Request URL: {ARM_API_BASE}{SAVE_DATA_PATH}")
+        log_info(f"Request params: {redact_params(params)}")
+    
+    # Stream the file to disk in 1 MiB chunks instead of holding the whole
+    # response in memory
+    async with get_http_client().stream("GET", SAVE_DATA_PATH, params=params) as response:
+        if response.status_code != 200:
+            await response.aread()
+            error_msg = f"Error downloading CDF file: {response.status_code}, {response.text}"
+            log_error(error_msg)
+            raise Exception(error_msg)
+
+        async for chunk in response.aiter_bytes(1 << 20):
+            dest.write(chunk)
+
+    log_info(f"File downloaded successfully to: {dest.name}")
+
+def evict_cache() -> None:
+    """Delete the least recently used cached CDF files until the cache fits in CACHE_MAX_BYTES.
+    
+    Files that are in use (see cached_cdf_file) still count towards the size but
+    are never deleted.
+    """
+    entries = []
+    for path in CACHE_FILES_DIR.iterdir():
+        if path.suffix == ".part" or not path.is_file():
+            continue
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            # Removed by another process since the listing
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= CACHE_MAX_BYTES:
+            break
+        if path in _CACHE_IN_USE:
+            continue
+        try:
+            path.unlink()
+            total -= size
+            log_info(f"Evicted cached CDF file: {path}")
+        except OSError as e:
+            log_error(f"Error evicting cached CDF file {path}: {str(e)}")
+
+@asynccontextmanager
+async def cached_cdf_file(cdf_file: str) -> AsyncIterator[Path]:
+    """Get the local path of a CDF file, downloading it into the cache if needed.
+    
+    The file is protected from eviction until the context exits, so concurrent
+    downloads can't delete it while it is being read.
+    
+    Args:
+        cdf_file: The name of the CDF file (e.g. 'nsametC1.b1.20200101.000000.cdf')
+        
+    Yields:
+        Path of the cached CDF file
+    """
+    path = await get_cdf_file(cdf_file)
+    try:
+        yield path
+    finally:
+        _CACHE_IN_USE[path] -= 1
+        if _CACHE_IN_USE[path] <= 0:
+            del _CACHE_IN_USE[path]
+
+async def get_cdf_file(cdf_file: str) -> Path:
+    """Return the local path of a CDF file, downloading it into the cache if needed.
+    
+    The returned path is marked in use; callers should go through cached_cdf_file,
+    which releases it.
+    
+    Args:
+        cdf_file: The name of the CDF file (e.g. 'nsametC1.b1.20200101.000000.cdf')
+        
+    Returns:
+        Path of the cached CDF file
+    """
+    # Must be a plain file name; "", "." and ".." would resolve to the cache
+    # directory or its parent
+    if not cdf_file or cdf_file in (".", "..") or Path(cdf_file).name != cdf_file:
+        raise ValueError(f"Invalid CDF file name: {cdf_file!r}")
+
+    path = CACHE_FILES_DIR / cdf_file
+    if path.is_file():
+        # Bump the modification time so eviction treats it as recently used
+        os.utime(path)
+        _CACHE_IN_USE[path] += 1
+        log_info(f"Using cached CDF file: {path}")
+        return path
+
+    # Download to a unique partial file and rename it into place, so concurrent
+    # requests for the same file never see a half-written copy
+    CACHE_FILES_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=CACHE_FILES_DIR, prefix=f"{cdf_file}.", suffix=".part", delete=False) as partial:
+        try:
+            await download_cdf_file(cdf_file, partial)
+            # Flush everything to disk before the file becomes visible under its name
+            partial.close()
+            os.replace(partial.name, path)
+        except BaseException:
+            partial.close()
+            Path(partial.name).unlink(missing_ok=True)
+            raise
+
+    # Mark the new file in use before making room for it
+    _CACHE_IN_USE[path] += 1
+    evict_cache()
+    return path
+
+async def fetch_cdf_variables(cdf_file: str, variables: list[str], auto_mask: bool = False) -> Dict:
+    """Fetch a CDF file once and return the requested variables encoded with encode_array.
+    
+    Args:
+        cdf_file: The name of the CDF file to download (e.g. 'nsametC1.b1.20200101.000000.cdf')
+        variables: The variables to return from the CDF file
+        auto_mask: Mask out fill values in the returned data (optional, defaults to raw values)
+        
+    Returns:
+        Dict mapping each variable name to its encoded data
+    """
+    async with cached_cdf_file(cdf_file) as cdf_path:
+        try:
+            # Read every requested variable while the dataset is open once
+            cdf_data = await read_cdf_file(str(cdf_path), variables=variables, auto_mask=auto_mask)
+        except CDFOpenError:
+            # Don't keep serving a corrupt or non-netCDF download from the cache
+            cdf_path.unlink(missing_ok=True)
+            log_info(f"Removed unreadable cached CDF file: {cdf_path}")
+            raise
+
+    result = {}
+    for variable in variables:
+        # Base64-encoding a large array is CPU-bound, so keep it off the event loop too
+        result[variable] = await asyncio.to_thread(encode_array, cdf_data["variables"][variable]["data"])
+    return result
 
 @mcp.tool()
-async def return_cdf_data(cdf_file: str, variable: str) -> Dict:
+async def return_cdf_data(cdf_file: str, variable: str, auto_mask: bool = False) -> Dict:
     """Download, read a CDF file from ARM Live Data API and return the data as a dictionary for further analysis.
     
     Args:
         cdf_file: The name of the CDF file to download (e.g. 'nsametC1.b1.20200101.000000.cdf')
+        variable: The variable to return from the CDF file
+        auto_mask: Mask out fill values in the returned data (optional, defaults to raw values)
         
     Returns:
-        Data Array from the CDF file
+        Dict with the variable's dtype, shape and base64-encoded raw bytes
+        (decode with np.frombuffer(base64.b64decode(data_b64), dtype).reshape(shape))
     """
     try:
-        # Get credentials from environment
-        username, api_token = get_credentials()
-        
-        # Create a temporary directory to store the downloaded file
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Construct the saveData URL
-            save_url = f"{ARM_API_BASE}/saveData"
-            params = {
-                "user": f"{username}:{api_token}",
-                "file": cdf_file
-            }
-            
-            log_info(f"Downloading CDF file: {cdf_file}")
-            log_info(f"Request URL: {save_url}")
-            log_info(f"Request params: {params}")
-            
-            # Download the file
-            response = requests.get(save_url, params=params)
-            
-            if response.status_code == 200:
-                # Save the file to temporary directory
-                temp_file_path = os.path.join(temp_dir, cdf_file)
-                with open(temp_file_path, 'wb') as f:
-                    f.write(response.content)
-                
-                log_info(f"File downloaded successfully to: {temp_file_path}")
-                
-                try:
-                    # Read the CDF file using our existing function
-                    cdf_data = await read_cdf_file(temp_file_path)
-                    return cdf_data["variables"][variable]["data"]
-                finally:
-                    # Ensure the temporary file is deleted after reading
-                    try:
-                        os.remove(temp_file_path)
-                        log_info(f"Temporary file deleted: {temp_file_path}")
-                    except Exception as e:
-                        log_error(f"Error deleting temporary file: {str(e)}")
-            else:
-                error_msg = f"Error downloading CDF file: {response.status_code}, {response.text}"
-                log_error(error_msg)
-                raise Exception(error_msg)
+        result = await fetch_cdf_variables(cdf_file, [variable], auto_mask=auto_mask)
+        return result[variable]
                 
     except Exception as e:
         log_error(f"Error in save_cdf_data: {str(e)}")
@@ -261,6 +666,50 @@ async def return_cdf_data(cdf_file: str, variable: str) -> Dict:
         traceback.print_exc(file=sys.stderr)
         raise Exception(f"Error downloading and reading CDF file: {str(e)}")
 
+@mcp.tool()
+async def return_cdf_data_batch(files: list[str], variables: list[str], auto_mask: bool = False) -> Dict:
+    """Download several CDF files from ARM Live Data API concurrently and return the requested variables from each.
+    
+    Args:
+        files: The names of the CDF files to download (e.g. ['nsametC1.b1.20200101.000000.cdf'])
+        variables: The variables to return from every CDF file
+        auto_mask: Mask out fill values in the returned data (optional, defaults to raw values)
+        
+    Returns:
+        Dict mapping each file name to a dict of variable name to encoded data,
+        in the same format as return_cdf_data. A file that could not be downloaded
+        or read maps to {'error': message} instead, without affecting the others
+    """
+    try:
+        # Bound the number of in-flight downloads so the ARM server isn't overloaded
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+
+        async def fetch_one(cdf_file: str) -> Dict:
+            async with semaphore:
+                return await fetch_cdf_variables(cdf_file, variables, auto_mask=auto_mask)
+
+        # Drop duplicate file names while keeping the caller's order
+        unique_files = list(dict.fromkeys(files))
+        # Collect failures per file so one bad file doesn't discard the rest
+        results = await asyncio.gather(
+            *[fetch_one(cdf_file) for cdf_file in unique_files],
+            return_exceptions=True,
+        )
+
+        batch = {}
+        for cdf_file, result in zip(unique_files, results):
+            if isinstance(result, BaseException):
+                log_error(f"Error fetching {cdf_file} in batch: {str(result)}")
+                batch[cdf_file] = {"error": f"Error downloading and reading CDF file: {str(result)}"}
+            else:
+                batch[cdf_file] = result
+        return batch
+
+    except Exception as e:
+        log_error(f"Error in return_cdf_data_batch: {str(e)}")
+        log_error("Full traceback:")
+        traceback.print_exc(file=sys.stderr)
+        raise Exception(f"Error downloading and reading CDF files: {str(e)}")
 
 if __name__ == '__main__':
     mcp.run("stdio") 